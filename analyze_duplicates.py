@@ -5,116 +5,181 @@ Analyze duplicate patterns in scraped data
 
 import json
 import argparse
+import heapq
+import os
 import sys
-from urllib.parse import urlparse
+from operator import countOf
 from collections import defaultdict, Counter
+from dedupe_core import normalize_url
+from json_stream import iter_json_items
 
-def analyze_duplicates(data):
-    """Analyze duplicate patterns in the data"""
+def count_repeated(counter):
+    """Number of keys that occur more than once"""
+    # countOf walks the values in C; counts are >= 1, so the rest repeat
+    return len(counter) - countOf(counter.values(), 1)
+
+def top_k(counter, k, min_count=1):
+    """
+    Return the k most common (key, count) pairs with count >= min_count
+    
+    Single pass with a size-k min-heap of plain tuples, no key function.
+    Ties keep first-seen order, matching Counter.most_common.
+    """
+    heap = []
+    for index, (key, count) in enumerate(counter.items()):
+        if count < min_count:
+            continue
+        entry = (count, -index, key)
+        if len(heap) < k:
+            heapq.heappush(heap, entry)
+        elif entry > heap[0]:
+            heapq.heapreplace(heap, entry)
+    return [(key, count) for count, _, key in sorted(heap, reverse=True)]
+
+def _text_length(value):
+    """Length of a text field; None counts as empty, other values as their str()"""
+    if isinstance(value, str):
+        return len(value)
+    if value is None:
+        return 0
+    return len(str(value))
+
+def _field_length(entry, *keys):
+    """Length of the text fields of a dict entry, or of the entry itself"""
+    if isinstance(entry, dict):
+        return sum(_text_length(entry.get(key)) for key in keys)
+    return _text_length(entry)
+
+def content_length(content):
+    """Measure content as the number of text characters it holds"""
+    # Sums the strings directly instead of len(str(...)) on each container,
+    # which built a full repr of every field just to measure it.
+    # Records from other scrapers may lack fields, hold None or use other
+    # shapes, so anything missing counts as empty rather than aborting the
+    # report.
+    content = content or {}
+    length = sum(_field_length(heading, 'text') for heading in content.get('headings') or ())
+    length += sum(map(_text_length, content.get('paragraphs') or ()))
+    for items in content.get('lists') or ():
+        length += sum(map(_text_length, items or ()))
+    for link in content.get('links') or ():
+        length += _field_length(link, 'url', 'text')
+    for image in content.get('images') or ():
+        length += _field_length(image, 'src', 'alt')
+    for table in content.get('tables') or ():
+        for row in table or ():
+            length += sum(map(_text_length, row or ()))
+    return length
+
+def analyze_duplicates(items, file_size=None):
+    """
+    Analyze duplicate patterns in the data (single pass over a stream of items)
+    
+    Args:
+        items: Iterable of scraped items
+        file_size: Size of the input file in bytes, if read from a file
+    """
+    
+    # Collect plain columns during the pass; counting and aggregation then
+    # run in C (Counter's bulk update, min/max/sum) instead of per item
+    urls = []
+    normalized_urls = []
+    titles = []
+    content_lengths = []
+    seen_urls = set()
+    duplicate_sample = None
+    
+    for item in items:
+        url = item.get('url')
+        if url is not None:
+            urls.append(url)
+            normalized_urls.append(normalize_url(url))
+            if duplicate_sample is None:
+                if url in seen_urls:
+                    duplicate_sample = item
+                    seen_urls = None
+                else:
+                    seen_urls.add(url)
+        else:
+            urls.append('NO_URL')
+            normalized_urls.append('NO_URL')
+        
+        titles.append(item.get('title', 'NO_TITLE'))
+        
+        content_lengths.append(content_length(item.get('content', {})))
+    
+    total = len(urls)
+    url_counter = Counter(urls)
+    norm_counter = Counter(normalized_urls)
+    title_counter = Counter(titles)
+    del urls, normalized_urls, titles
     
-    print(f"📊 Analyzing {len(data)} items...")
+    print(f"📊 Analyzing {total} items...")
     print("=" * 60)
     
     # 1. URL Analysis
     print("\n🔗 URL Analysis:")
-    urls = [item.get('url', 'NO_URL') for item in data]
-    url_counter = Counter(urls)
-    
-    print(f"Total items: {len(data)}")
-    print(f"Unique URLs: {len(set(urls))}")
-    print(f"Duplicate URLs: {len([url for url, count in url_counter.items() if count > 1])}")
+    print(f"Total items: {total}")
+    print(f"Unique URLs: {len(url_counter)}")
+    print(f"Duplicate URLs: {count_repeated(url_counter)}")
     
     # Show most common URLs
     print("\nMost common URLs:")
-    for url, count in url_counter.most_common(10):
-        if count > 1:
-            print(f"  {count}x: {url}")
+    for url, count in top_k(url_counter, 10, min_count=2):
+        print(f"  {count}x: {url}")
     
     # 2. Normalized URL Analysis
     print("\n🔗 Normalized URL Analysis:")
-    normalized_urls = []
-    for item in data:
-        if 'url' in item:
-            parsed = urlparse(item['url'])
-            normalized = f"{parsed.scheme}://{parsed.netloc}{parsed.path}"
-            normalized_urls.append(normalized)
-        else:
-            normalized_urls.append('NO_URL')
-    
-    norm_counter = Counter(normalized_urls)
-    print(f"Unique normalized URLs: {len(set(normalized_urls))}")
-    print(f"Duplicate normalized URLs: {len([url for url, count in norm_counter.items() if count > 1])}")
+    print(f"Unique normalized URLs: {len(norm_counter)}")
+    print(f"Duplicate normalized URLs: {count_repeated(norm_counter)}")
     
     # Show most common normalized URLs
     print("\nMost common normalized URLs:")
-    for url, count in norm_counter.most_common(10):
-        if count > 1:
-            print(f"  {count}x: {url}")
+    for url, count in top_k(norm_counter, 10, min_count=2):
+        print(f"  {count}x: {url}")
     
     # 3. Title Analysis
     print("\n📝 Title Analysis:")
-    titles = [item.get('title', 'NO_TITLE') for item in data]
-    title_counter = Counter(titles)
-    
-    print(f"Unique titles: {len(set(titles))}")
-    print(f"Duplicate titles: {len([title for title, count in title_counter.items() if count > 1])}")
+    print(f"Unique titles: {len(title_counter)}")
+    print(f"Duplicate titles: {count_repeated(title_counter)}")
     
     # Show most common titles
     print("\nMost common titles:")
-    for title, count in title_counter.most_common(5):
-        if count > 1:
-            print(f"  {count}x: {title[:80]}...")
+    for title, count in top_k(title_counter, 5, min_count=2):
+        print(f"  {count}x: {title[:80]}...")
     
     # 4. Content Length Analysis
     print("\n📏 Content Length Analysis:")
-    content_lengths = []
-    for item in data:
-        content = item.get('content', {})
-        total_length = 0
-        total_length += len(str(content.get('headings', [])))
-        total_length += len(str(content.get('paragraphs', [])))
-        total_length += len(str(content.get('lists', [])))
-        total_length += len(str(content.get('links', [])))
-        total_length += len(str(content.get('images', [])))
-        total_length += len(str(content.get('tables', [])))
-        content_lengths.append(total_length)
-    
     print(f"Average content length: {sum(content_lengths) // len(content_lengths):,} chars")
     print(f"Min content length: {min(content_lengths):,} chars")
     print(f"Max content length: {max(content_lengths):,} chars")
     
     # 5. Sample of items with same URL
     print("\n🔍 Sample of duplicate URL items:")
-    seen_urls = set()
-    for item in data:
-        if 'url' in item:
-            if item['url'] in seen_urls:
-                print(f"\nDuplicate found for: {item['url']}")
-                print(f"  Title: {item.get('title', 'NO_TITLE')}")
-                print(f"  Content keys: {list(item.get('content', {}).keys())}")
-                break
-            seen_urls.add(item['url'])
-    
-    # 6. File size estimation
-    print("\n💾 File Size Analysis:")
-    sample_size = len(json.dumps(data[:10], indent=2))
-    estimated_size_mb = (sample_size / 10) * len(data) / (1024 * 1024)
-    print(f"Estimated file size: {estimated_size_mb:.1f} MB")
+    if duplicate_sample is not None:
+        print(f"\nDuplicate found for: {duplicate_sample['url']}")
+        print(f"  Title: {duplicate_sample.get('title', 'NO_TITLE')}")
+        print(f"  Content keys: {list(duplicate_sample.get('content', {}).keys())}")
+    
+    # 6. File size
+    if file_size is not None:
+        print("\n💾 File Size Analysis:")
+        print(f"File size: {file_size / (1024 * 1024):.1f} MB")
     
     # 7. Recommendations
     print("\n💡 Recommendations:")
-    if len(set(urls)) == len(data):
+    if len(url_counter) == total:
         print("  ✅ No URL duplicates found - data is already unique by URL")
     else:
-        print(f"  🔧 Found {len(data) - len(set(urls))} URL duplicates")
+        print(f"  🔧 Found {total - len(url_counter)} URL duplicates")
         print("  🔧 Consider URL-based deduplication")
     
-    if len(set(normalized_urls)) < len(set(urls)):
-        print(f"  🔧 Found {len(set(urls)) - len(set(normalized_urls))} URL variations")
+    if len(norm_counter) < len(url_counter):
+        print(f"  🔧 Found {len(url_counter) - len(norm_counter)} URL variations")
         print("  🔧 Consider normalized URL deduplication")
     
-    if len(set(titles)) < len(data):
-        print(f"  🔧 Found {len(data) - len(set(titles))} title duplicates")
+    if len(title_counter) < total:
+        print(f"  🔧 Found {total - len(title_counter)} title duplicates")
         print("  🔧 Consider title-based deduplication")
 
 def main():
@@ -124,12 +189,9 @@ def main():
     args = parser.parse_args()
     
     try:
-        # Read input file
+        # Stream the input file straight into the analysis
         with open(args.input_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        # Analyze
-        analyze_duplicates(data)
+            analyze_duplicates(iter_json_items(f), file_size=os.fstat(f.fileno()).st_size)
         
     except FileNotFoundError:
         print(f"❌ Error: File '{args.input_file}' not found")
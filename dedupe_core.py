@@ -0,0 +1,77 @@
+"""
+Shared URL deduplication kernel for the dedupe scripts
+Kept to plain typed Python so it can be compiled with mypyc (mypyc dedupe_core.py)
+"""
+
+import re
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, Iterator, Optional, Set
+
+# Everything before the first '?' or '#' is scheme://netloc/path
+_URL_RE = re.compile(r'^[^?#]+')
+
+@lru_cache(maxsize=None)
+def normalize_url(url: str) -> str:
+    """Normalize URL by removing fragments and query parameters"""
+    m = _URL_RE.match(url)
+    return m.group(0) if m else url
+
+def new_stats() -> Dict[str, int]:
+    """Counters filled in by dedupe_urls_stream"""
+    return {'total': 0, 'duplicates': 0, 'filtered': 0, 'missing_url': 0}
+
+def dedupe_urls_stream(items: Iterable[dict],
+                       stats: Dict[str, int],
+                       url_filter: Optional[Callable[[str], bool]] = None,
+                       show_items: bool = False) -> Iterator[dict]:
+    """
+    Yield items whose normalized URL has not been seen before
+
+    Items without a URL are always kept. Items whose URL fails url_filter
+    are dropped before dedup.
+
+    Args:
+        items: Iterable of scraped items (consumed once, may be a stream)
+        stats: Counter dict from new_stats(), updated as items are consumed
+        url_filter: Optional predicate on the raw URL
+        show_items: Whether to print a line for dropped/URL-less items
+
+    Yields:
+        Surviving items, in input order
+    """
+    seen_urls: Set[str] = set()
+    total = 0
+    duplicates = 0
+    filtered = 0
+    missing_url = 0
+
+    try:
+        for item in items:
+            total += 1
+            url = item.get('url')
+            if url is None:
+                # Item has no URL, keep it
+                missing_url += 1
+                if show_items:
+                    print(f"⚠ No URL found, keeping item")
+                yield item
+                continue
+
+            if url_filter is not None and not url_filter(url):
+                filtered += 1
+                continue
+
+            normalized_url = normalize_url(url)
+
+            if normalized_url not in seen_urls:
+                seen_urls.add(normalized_url)
+                yield item
+            else:
+                duplicates += 1
+                if show_items:
+                    print(f"✗ Duplicate URL: {url}")
+    finally:
+        stats['total'] += total
+        stats['duplicates'] += duplicates
+        stats['filtered'] += filtered
+        stats['missing_url'] += missing_url
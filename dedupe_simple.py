@@ -7,62 +7,46 @@ Removes duplicate entries based on URL only
 import json
 import argparse
 import sys
-from urllib.parse import urlparse
+from dedupe_core import dedupe_urls_stream, new_stats
+from json_stream import iter_json_items
 
-def normalize_url(url):
-    """Normalize URL by removing fragments and query parameters"""
-    parsed = urlparse(url)
-    return f"{parsed.scheme}://{parsed.netloc}{parsed.path}"
+WRITE_BUFFER_SIZE = 1 << 20
 
-def deduplicate_by_url(data, output_file=None, verbose=True):
+def deduplicate_by_url(items, output_file=None, verbose=True, show_items=False):
     """
     Deduplicate scraped data by URL only
     
     Args:
-        data: List of scraped items
+        items: Iterable of scraped items (consumed once, may be a stream)
         output_file: Optional output file path
-        verbose: Whether to print progress information
+        verbose: Whether to print a summary
+        show_items: Whether to also print a line per item (slow on large inputs)
     
     Returns:
         Deduplicated data list
     """
-    if verbose:
-        print(f"Original data: {len(data)} items")
-    
-    # Track seen URLs
-    seen_urls = set()
+    stats = new_stats()
     deduplicated = []
-    duplicates_removed = 0
-    
-    for item in data:
-        if 'url' in item:
-            normalized_url = normalize_url(item['url'])
-            
-            if normalized_url not in seen_urls:
-                seen_urls.add(normalized_url)
-                deduplicated.append(item)
-                if verbose:
-                    print(f"✓ Kept: {item['url']}")
-            else:
-                duplicates_removed += 1
-                if verbose:
-                    print(f"✗ Duplicate URL: {item['url']}")
-        else:
-            # Item has no URL, keep it
-            deduplicated.append(item)
-            if verbose:
-                print(f"⚠ No URL found, keeping item")
+    for item in dedupe_urls_stream(items, stats, show_items=show_items):
+        deduplicated.append(item)
+        if show_items and item.get('url') is not None:
+            print(f"✓ Kept: {item['url']}")
+    total = stats['total']
+    duplicates_removed = stats['duplicates']
+    missing_url = stats['missing_url']
     
     if verbose:
         print(f"\nDeduplication complete!")
-        print(f"Original: {len(data)} items")
+        print(f"Original: {total} items")
         print(f"Deduplicated: {len(deduplicated)} items")
         print(f"Removed: {duplicates_removed} duplicates")
-        print(f"Reduction: {(duplicates_removed / len(data) * 100):.1f}%")
+        if missing_url:
+            print(f"Kept without URL: {missing_url} items")
+        print(f"Reduction: {(duplicates_removed / total * 100):.1f}%")
     
     # Save to file if specified
     if output_file:
-        with open(output_file, 'w', encoding='utf-8') as f:
+        with open(output_file, 'w', encoding='utf-8', buffering=WRITE_BUFFER_SIZE) as f:
             json.dump(deduplicated, f, indent=2, ensure_ascii=False)
         if verbose:
             print(f"Saved deduplicated data to: {output_file}")
@@ -74,14 +58,11 @@ def main():
     parser.add_argument('input_file', help='Input JSON file with scraped data')
     parser.add_argument('-o', '--output', help='Output file (default: input_file_deduplicated.json)')
     parser.add_argument('-q', '--quiet', action='store_true', help='Suppress verbose output')
+    parser.add_argument('-v', '--verbose', action='store_true', help='Print a line for every item')
     
     args = parser.parse_args()
     
     try:
-        # Read input file
-        with open(args.input_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
         # Determine output file
         if args.output:
             output_file = args.output
@@ -89,8 +70,9 @@ def main():
             base_name = args.input_file.rsplit('.', 1)[0]
             output_file = f"{base_name}_deduplicated.json"
         
-        # Deduplicate
-        deduplicated = deduplicate_by_url(data, output_file, verbose=not args.quiet)
+        # Stream the input file straight into deduplication
+        with open(args.input_file, 'r', encoding='utf-8') as f:
+            deduplicated = deduplicate_by_url(iter_json_items(f), output_file, verbose=not args.quiet, show_items=args.verbose)
         
         print(f"\n✅ Deduplication successful!")
         print(f"📁 Output: {output_file}")
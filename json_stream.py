@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Incremental JSON reader for scraped data files
+Yields items one at a time instead of materializing the whole file with json.load
+Accepts both a top-level JSON array and JSON Lines (one object per line)
+"""
+
+import json
+import re
+
+CHUNK_SIZE = 1 << 16
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+# What can be left of a number cut by a read: raw_decode stops before it
+_NUMBER_CUT = re.compile(r'[.eE][-+]?')
+# Decode errors this close to the end of the buffer may just be a value
+# cut by a read (the longest such tail is a split \uXXXX\uXXXX escape)
+_REFILL_MARGIN = 16
+
+def _decode_error(msg, buf, pos, buf_start, buf_lines, line_start):
+    """
+    JSONDecodeError for buf[pos], located in the whole file
+
+    buf_start is the file offset of buf[0], buf_lines the number of newlines
+    before it and line_start the file offset of the line buf[0] is on.
+    """
+    err = json.JSONDecodeError(msg, buf, pos)
+    err.pos = buf_start + pos
+    err.lineno = buf_lines + buf.count('\n', 0, pos) + 1
+    last_newline = buf.rfind('\n', 0, pos)
+    err.colno = pos - last_newline if last_newline >= 0 else err.pos - line_start + 1
+    err.args = ('%s: line %d column %d (char %d)' % (msg, err.lineno, err.colno, err.pos),)
+    return err
+
+def iter_json_items(f, chunk_size=CHUNK_SIZE):
+    """
+    Iterate over the items of a JSON array or JSON Lines file
+
+    Args:
+        f: Text file object opened for reading
+        chunk_size: Number of characters to read per refill
+
+    Yields:
+        Decoded items, one at a time
+
+    Raises:
+        json.JSONDecodeError: If the input is not valid JSON
+    """
+    buf = ''
+    pos = 0
+    eof = False
+    # Where buf sits in the file, for error positions (see _decode_error)
+    buf_start = 0
+    buf_lines = 0
+    line_start = 0
+
+    def error(msg, at):
+        return _decode_error(msg, buf, at, buf_start, buf_lines, line_start)
+
+    def drop(count):
+        # Account for buf[:count] being discarded on a refill
+        nonlocal buf_start, buf_lines, line_start
+        newlines = buf.count('\n', 0, count)
+        if newlines:
+            buf_lines += newlines
+            line_start = buf_start + buf.rindex('\n', 0, count) + 1
+        buf_start += count
+    # start -> (array: first -> sep <-> value -> end) or (lines)
+    state = 'start'
+
+    while True:
+        pos = _WHITESPACE.match(buf, pos).end()
+        if pos == len(buf):
+            if eof:
+                break
+            drop(len(buf))
+            buf = f.read(chunk_size)
+            pos = 0
+            eof = not buf
+            continue
+
+        if state == 'start':
+            if buf[pos] == '[':
+                pos += 1
+                state = 'first'
+            else:
+                state = 'lines'
+            continue
+
+        if state == 'end':
+            raise error("Extra data", pos)
+
+        if state in ('first', 'sep') and buf[pos] == ']':
+            pos += 1
+            state = 'end'
+            continue
+
+        if state == 'sep':
+            if buf[pos] != ',':
+                raise error("Expecting ',' delimiter", pos)
+            pos += 1
+            state = 'value'
+            continue
+
+        # Decode the next value, reading more input while it is incomplete.
+        # Read sizes grow with the pending value so huge items stay O(n).
+        while True:
+            try:
+                item, end = _decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError as e:
+                # An error well inside the buffer is real; only one at the
+                # end (or an unclosed string) may be fixed by reading more
+                if eof or (e.pos < len(buf) - _REFILL_MARGIN
+                           and not e.msg.startswith('Unterminated string')):
+                    raise error(e.msg, e.pos) from None
+                end = None
+            if end is not None and (end < len(buf) or eof):
+                if (eof or type(item) not in (int, float)
+                        or not _NUMBER_CUT.fullmatch(buf, end)):
+                    break
+            more = f.read(max(chunk_size, len(buf) - pos))
+            drop(pos)
+            buf = buf[pos:] + more
+            pos = 0
+            eof = not more
+
+        pos = end
+        if state != 'lines':
+            state = 'sep'
+        yield item
+
+    if state == 'start':
+        raise error("Expecting value", pos)
+    if state in ('first', 'sep', 'value'):
+        raise error("Expecting ']'", pos)
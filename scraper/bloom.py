@@ -0,0 +1,106 @@
+# Bloom filters used by the spider to remember which URLs it has seen.
+#
+# A filter answers "have I seen this URL?" in a fixed number of bit reads and
+# uses ~3-4 bytes per URL instead of a full string plus a set slot. Answers
+# can be false positives (a new URL reported as seen) with a bounded
+# probability, but never false negatives.
+
+import hashlib
+import math
+
+
+class BloomFilter:
+    """Fixed-capacity Bloom filter addressed by a pair of 64-bit hashes"""
+
+    def __init__(self, capacity, error_rate):
+        capacity = max(capacity, 1)
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.num_bits = max(8, int(math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2))))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, h1, h2):
+        # Double hashing: k positions derived from two independent hashes
+        num_bits = self.num_bits
+        return [(h1 + i * h2) % num_bits for i in range(self.num_hashes)]
+
+    def contains(self, h1, h2):
+        bits = self.bits
+        for pos in self._positions(h1, h2):
+            if not bits[pos >> 3] & (1 << (pos & 7)):
+                return False
+        return True
+
+    def insert(self, h1, h2):
+        bits = self.bits
+        for pos in self._positions(h1, h2):
+            bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def add(self, h1, h2):
+        """Insert a key, returning True if it was (probably) already present"""
+        bits = self.bits
+        present = True
+        for pos in self._positions(h1, h2):
+            mask = 1 << (pos & 7)
+            if not bits[pos >> 3] & mask:
+                bits[pos >> 3] |= mask
+                present = False
+        if not present:
+            self.count += 1
+        return present
+
+
+class ScalableBloomFilter:
+    """
+    Set-like Bloom filter over strings that grows as it fills
+
+    When the current slice reaches its capacity a new one is added with
+    `growth` times the capacity and a `tightening` times smaller error rate,
+    so the overall false-positive rate stays below error_rate however many
+    keys are added.
+    """
+
+    def __init__(self, initial_capacity=100000, error_rate=1e-6, growth=2, tightening=0.5):
+        self.growth = growth
+        self.tightening = tightening
+        self.filters = [BloomFilter(initial_capacity, error_rate * (1 - tightening))]
+        self._count = 0
+
+    @staticmethod
+    def fingerprint(key):
+        """The pair of 64-bit hashes a key is stored under"""
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        return int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+
+    def _contains(self, h1, h2):
+        for bloom in self.filters:
+            if bloom.contains(h1, h2):
+                return True
+        return False
+
+    def __contains__(self, key):
+        return self._contains(*self.fingerprint(key))
+
+    def __len__(self):
+        """Number of distinct keys added"""
+        return self._count
+
+    def add(self, key):
+        """Add a key, returning True if it was (probably) already present"""
+        return self.add_fingerprint(self.fingerprint(key))
+
+    def add_fingerprint(self, fp):
+        """add() for a key already hashed with fingerprint()"""
+        h1, h2 = fp
+        if self._contains(h1, h2):
+            return True
+        current = self.filters[-1]
+        if current.count >= current.capacity:
+            current = BloomFilter(current.capacity * self.growth, current.error_rate * self.tightening)
+            self.filters.append(current)
+        current.insert(h1, h2)
+        self._count += 1
+        return False
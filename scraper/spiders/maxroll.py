@@ -1,14 +1,143 @@
 import scrapy
+from scrapy.http import HtmlResponse
 import json
+import logging
+import re
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from urllib.parse import urljoin, urlparse, urlunparse
+import mmap
 import os
 
+from w3lib.url import canonicalize_url
+
+from scraper.bloom import ScalableBloomFilter
+
+
+# URLs repeat heavily across pages (every page links the same navigation),
+# so parsing results are memoized instead of recomputed per link. The caches
+# keep their URL strings alive, so they stay small: a few thousand entries
+# cover the repeated links without undoing the Bloom filters' memory saving.
+URL_CACHE_SIZE = 4096
+
+
+_DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+def _normalize_url(url):
+    """
+    Normalize URL to handle slight variations. canonicalize_url (the same
+    canonical form Scrapy's request fingerprints use) lowercases scheme and
+    host, sorts query parameters, normalizes percent-escapes and drops the
+    fragment; default ports and trailing slashes are dropped on top of that.
+    """
+    try:
+        parsed = urlparse(canonicalize_url(url))
+    except ValueError:
+        # Malformed URL (e.g. a non-numeric port): only drop the fragment
+        return url.split('#', 1)[0]
+    
+    netloc = parsed.netloc
+    try:
+        port = parsed.port
+    except ValueError:
+        port = None  # Out-of-range port: keep the netloc as-is
+    if port is not None and port == _DEFAULT_PORTS.get(parsed.scheme):
+        netloc = netloc.rsplit(':', 1)[0]
+    
+    path = parsed.path
+    if len(path) > 1 and path.endswith('/'):
+        path = path.rstrip('/') or '/'
+    
+    return urlunparse((
+        parsed.scheme,
+        netloc,
+        path,
+        parsed.params,
+        parsed.query,
+        ''
+    ))
+
+
+@lru_cache(maxsize=URL_CACHE_SIZE)
+def _url_fingerprint(url):
+    """Bloom filter fingerprint of the normalized URL (this cache also covers _normalize_url)"""
+    return ScalableBloomFilter.fingerprint(_normalize_url(url))
+
+
+@lru_cache(maxsize=URL_CACHE_SIZE)
+def _path_parts(url):
+    """Non-empty path segments of a URL, as a tuple"""
+    return tuple(part for part in urlparse(url).path.split('/') if part)
+
+
+# scheme://host part of an absolute URL
+_SITE_ROOT_RE = re.compile(r'[^:/?#]+://[^/?#]*')
+
+
+@lru_cache(maxsize=URL_CACHE_SIZE)
+def _join_root_relative(site_root, href):
+    """urljoin for a root-relative href, which only depends on the site root"""
+    return urljoin(site_root, href)
+
+
+def _urljoin(base, href):
+    """
+    urljoin. Root-relative hrefs (shared navigation links) are memoized per
+    site; other results depend on the page URL, which rarely repeats.
+    """
+    if href.startswith('/') and not href.startswith('//'):
+        match = _SITE_ROOT_RE.match(base)
+        if match is not None:
+            return _join_root_relative(match.group(), href)
+    return urljoin(base, href)
+
+
+# Output is written in blocks of this many bytes
+OUTPUT_CHUNK_SIZE = 1 << 16
+
+# Records streamed to the spool file while crawling are handed to the
+# writer thread in blocks of this many bytes
+SPOOL_BUFFER_SIZE = 1 << 20
+
+# Shared encoder for output records (json.dumps with non-default options
+# builds a new JSONEncoder on every call)
+_encode_json = json.JSONEncoder(ensure_ascii=False).encode
+
+
+# Pages larger than this are not parsed (maxroll.gg guides are well under it)
+MAX_PAGE_BYTES = 5 * 1024 * 1024
+
+
+HEADING_LEVELS = {'h1': 1, 'h2': 2, 'h3': 3, 'h4': 4, 'h5': 5, 'h6': 6}
+
+
+def _own_text(element):
+    """Text nodes directly under an element (what the CSS 'tag::text' selector returns)"""
+    texts = []
+    if element.text is not None:
+        texts.append(element.text)
+    for child in element:
+        if child.tail is not None:
+            texts.append(child.tail)
+    return texts
+
 
 class MaxrollSpider(scrapy.Spider):
     name = "maxroll"
     allowed_domains = ["maxroll.gg"]
     
-    def __init__(self, start_urls=None, filter_depth=1, max_depth=None, output_file='output.json', max_pages=10000, *args, **kwargs):
+    # Links worth following: on maxroll.gg (which also rules out javascript:
+    # and mailto:), without a fragment, and not ending in a document/image
+    # extension. Precompiled so each link costs one C-level scan.
+    _DOMAIN_RE = re.compile(r'^https://maxroll\.gg(?:[/?]|$)')
+    _SKIP_RE = re.compile(r'#|^[^?]*\.(?:pdf|jpe?g|png|gif|webp|svg)(?:\?|$)', re.IGNORECASE)
+    
+    # What may follow the first path segment of a URL ('' = end of URL)
+    _SEGMENT_ENDS = ('', '/', '?', '#')
+    
+    def __init__(self, start_urls=None, filter_depth=1, max_depth=None, output_file='output.json', max_pages=10000, dedupe_paragraphs=False, *args, **kwargs):
         super(MaxrollSpider, self).__init__(*args, **kwargs)
         if start_urls:
             self.start_urls = start_urls.split(',')
@@ -24,6 +153,12 @@ class MaxrollSpider(scrapy.Spider):
         # Set maximum pages to scrape (very high number = effectively no limit)
         self.max_pages = int(max_pages) if max_pages is not None else 10000
         
+        # Drop paragraphs already seen on an earlier page (navigation, footers,
+        # shared intros); off by default since the first page crawled keeps them
+        self.dedupe_paragraphs = str(dedupe_paragraphs).lower() in ('1', 'true', 'yes')
+        self.paragraphs_seen = ScalableBloomFilter() if self.dedupe_paragraphs else None
+        self.duplicate_paragraphs_skipped = 0
+        
         # Set output file
         self.output_file = output_file
         
@@ -33,26 +168,50 @@ class MaxrollSpider(scrapy.Spider):
         else:
             self.path_filter = None
         
+        # With filter_depth == 1 a link matches when its path starts with this
+        # single segment, which _matches_filter checks with one startswith
+        if self.path_filter and self.filter_depth == 1:
+            self._filter_prefix = 'https://maxroll.gg/' + self.path_filter
+        else:
+            self._filter_prefix = None
+        
         # Progress tracking
         self.pages_processed = 0
         self.pages_filtered = 0
         self.depth_exceeded = 0
+        self.pages_skipped = 0       # Non-HTML or oversized responses
         self.estimated_total_pages = 0
         self.current_page_url = ""
         
-        # URL tracking - two separate lists
-        self.urls_found = set()      # All unique URLs discovered
-        self.urls_scraped = set()    # URLs that have been actually scraped
+        # URL tracking - two separate Bloom filters (a few bytes per URL
+        # instead of a full string in a set; len() is a running count)
+        self.urls_found = ScalableBloomFilter()      # All unique URLs discovered
+        self.urls_scraped = ScalableBloomFilter()    # URLs that have been actually scraped
         self.duplicate_urls_skipped = 0
         
-        # Data collection for sorting and deduplication
-        self.collected_data = []     # Store all scraped data in memory
+        # Data collection for sorting and deduplication. Records are streamed
+        # to a spool file as pages are scraped; only their position in it is
+        # kept in memory, keyed by URL. Record i spans
+        # _spool_offsets[i]:_spool_offsets[i + 1], so positions live in one
+        # flat array instead of a tuple per record.
+        self.collected_data = {}     # URL -> index of its record in the spool file
+        self._spool_offsets = array('q', [0])
+        self.duplicate_records = 0   # Records dropped because their URL was already collected
+        self.spool_file = self.output_file + '.tmp'
+        self._spool_fh = None
+        self._spool_pending = bytearray()  # Encoded records not yet handed to the writer
+        self._spool_failed = False   # Set once the spool file can't be trusted to match _spool_offsets
+        self._compact_fh = None      # Open handle for _write_compact_output
+        
+        # File writes during the crawl run on one background thread so a slow
+        # disk never stalls the reactor; a single worker keeps them in order
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='maxroll-writer')
         
         # Add starting URLs to both sets
         for start_url in self.start_urls:
-            normalized_url = self._normalize_url(start_url)
-            self.urls_found.add(normalized_url)
-            self.urls_scraped.add(normalized_url)
+            fp = _url_fingerprint(start_url)
+            self.urls_found.add_fingerprint(fp)
+            self.urls_scraped.add_fingerprint(fp)
         
         # Log initialization
         self.logger.info(f"Spider initialized with filter_depth={self.filter_depth}, max_depth={self.max_depth}, path_filter={self.path_filter}")
@@ -64,25 +223,16 @@ class MaxrollSpider(scrapy.Spider):
             self.logger.info(f"Cleared output file: {self.output_file}")
         except Exception as e:
             self.logger.error(f"Error clearing output file: {e}")
-
-    def _normalize_url(self, url):
-        """Normalize URL to handle slight variations (remove fragments, normalize scheme)"""
-        parsed = urlparse(url)
-        # Remove fragments and normalize
-        normalized = urlunparse((
-            parsed.scheme,
-            parsed.netloc,
-            parsed.path,
-            parsed.params,
-            parsed.query,
-            ''  # Remove fragment
-        ))
-        return normalized
+        
+        try:
+            self._spool_fh = open(self.spool_file, 'w+b')
+        except Exception as e:
+            self._spool_failed = True
+            self.logger.error(f"Error opening spool file: {e}")
 
     def _get_path_filter(self, url):
         """Extract the path segments to use as a filter based on filter_depth"""
-        parsed = urlparse(url)
-        path_parts = [part for part in parsed.path.split('/') if part]
+        path_parts = _path_parts(url)
         
         if self.filter_depth == 0:
             return None  # No filtering
@@ -99,9 +249,20 @@ class MaxrollSpider(scrapy.Spider):
         """Check if URL matches the path filter"""
         if not self.path_filter or self.filter_depth == 0:
             return True
+        
+        prefix = self._filter_prefix
+        if prefix is not None and url.startswith('https://maxroll.gg/') and not url.startswith('https://maxroll.gg//'):
+            # Simple first-level matching: the prefix must end the first
+            # path segment. A ';' after it is left to urlparse, which only
+            # splits ;params off the last segment, and so are paths with
+            # empty leading segments, which _path_parts skips.
+            if not url.startswith(prefix):
+                return False
+            follower = url[len(prefix):len(prefix) + 1]
+            if follower != ';':
+                return follower in self._SEGMENT_ENDS
 
-        parsed = urlparse(url)
-        path_parts = [part for part in parsed.path.split('/') if part]
+        path_parts = _path_parts(url)
         
         if self.filter_depth == 1:
             # Simple first-level matching
@@ -116,23 +277,19 @@ class MaxrollSpider(scrapy.Spider):
                 url_path = '/'.join(path_parts)
                 return self.path_filter.startswith(url_path + '/') or url_path == self.path_filter
 
-    def _estimate_total_pages(self, response):
+    def _estimate_total_pages(self, link_urls):
         """Estimate total pages by counting links on the starting page"""
         if self.pages_processed == 1:  # Only do this on the first page
             potential_links = 0
             filtered_links = 0
             
-            for link in response.css('a[href]'):
-                href = link.css('::attr(href)').get()
-                if href:
-                    full_url = urljoin(response.url, href)
-                    if (full_url.startswith('https://maxroll.gg') and 
-                        not any(skip in full_url for skip in ['#', 'javascript:', 'mailto:', '.pdf', '.jpg', '.png', '.gif', '.webp', '.svg'])):
-                        
-                        if self._matches_filter(full_url):
-                            potential_links += 1
-                        else:
-                            filtered_links += 1
+            for full_url in link_urls:
+                if self._DOMAIN_RE.match(full_url) and not self._SKIP_RE.search(full_url):
+                    
+                    if self._matches_filter(full_url):
+                        potential_links += 1
+                    else:
+                        filtered_links += 1
             
             # Estimate based on potential links found
             # Assume each page has similar link density
@@ -162,7 +319,19 @@ class MaxrollSpider(scrapy.Spider):
         # Check if we've exceeded max depth
         if self.max_depth is not None and current_depth > self.max_depth:
             self.depth_exceeded += 1
-            self.logger.info(f"Max depth exceeded ({current_depth} > {self.max_depth}) for URL: {response.url}")
+            self.logger.info("Max depth exceeded (%d > %d) for URL: %s", current_depth, self.max_depth, response.url)
+            return
+        
+        # Skip non-HTML and oversized responses before building a tree for them
+        # (Scrapy picks HtmlResponse from the Content-Type or, without one, by
+        # sniffing the body)
+        if not isinstance(response, HtmlResponse):
+            self.pages_skipped += 1
+            self.logger.debug("Skipping non-HTML response (%s): %s", type(response).__name__, response.url)
+            return
+        if len(response.body) > MAX_PAGE_BYTES:
+            self.pages_skipped += 1
+            self.logger.debug("Skipping oversized response (%d bytes): %s", len(response.body), response.url)
             return
         
         # Update current page URL for progress tracking
@@ -171,129 +340,162 @@ class MaxrollSpider(scrapy.Spider):
         # Log progress
         self.pages_processed += 1
         
-        # Estimate total pages on first page
-        self._estimate_total_pages(response)
-        
         # Calculate progress percentage
+        urls_found_count = len(self.urls_found)
         progress_percent = 0
-        if len(self.urls_found) > 0:
-            progress_percent = min((self.pages_processed / len(self.urls_found)) * 100, 100)
-        
-        self.logger.info(f"Processing page {self.pages_processed}/{len(self.urls_found)} ({progress_percent:.1f}%): {response.url} (depth: {current_depth}) - Total discovered: {len(self.urls_found)}, Total scraped: {len(self.urls_scraped)})")
+        if urls_found_count > 0:
+            progress_percent = min((self.pages_processed / urls_found_count) * 100, 100)
+        
+        self.logger.info("Processing page %d/%d (%.1f%%): %s (depth: %d) - Total discovered: %d, Total scraped: %d)",
+                         self.pages_processed, urls_found_count, progress_percent, response.url, current_depth,
+                         urls_found_count, len(self.urls_scraped))
+        
+        # Extract everything in a single walk over the parsed tree instead of
+        # one CSS query (and tree traversal) per element type
+        title = None
+        first_h1_text = None
+        headings_by_level = {level: [] for level in range(1, 7)}
+        paragraphs = []
+        paragraphs_seen = self.paragraphs_seen
+        ul_elements = []
+        links = []
+        link_urls = []  # Absolute URL of every a[href], for following
+        images = []
+        meta = {}
+        structured_data = []
+        table_elements = []
+        code_blocks = []
         
-        # Extract page title
-        title = response.css('title::text').get()
-        if not title:
-            title = response.css('h1::text').get()
+        for el in response.selector.root.iter():
+            tag = el.tag
+            if not isinstance(tag, str):
+                continue  # Comments and processing instructions
+            
+            level = HEADING_LEVELS.get(tag)
+            if level is not None:
+                # Headings
+                texts = _own_text(el)
+                if level == 1 and first_h1_text is None and texts:
+                    first_h1_text = texts[0]
+                for text in texts:
+                    headings_by_level[level].append({
+                        'level': level,
+                        'text': text.strip()
+                    })
+            elif tag == 'p':
+                # Paragraphs
+                for p in _own_text(el):
+                    # Only meaningful paragraphs; a text node that is short
+                    # before stripping can't pass, so skip the strip copy
+                    if len(p) <= 10:
+                        continue
+                    text = p.strip()
+                    if len(text) > 10:
+                        if paragraphs_seen is not None and paragraphs_seen.add(text):
+                            self.duplicate_paragraphs_skipped += 1
+                            continue
+                        paragraphs.append(text)
+            elif tag == 'a':
+                # Links
+                href = el.get('href')
+                if href:
+                    full_url = _urljoin(response.url, href)
+                    link_urls.append(full_url)
+                    text = next(el.itertext(), None)
+                    if text:
+                        links.append({
+                            'url': full_url,
+                            'text': text.strip()
+                        })
+            elif tag == 'img':
+                # Images
+                src = el.get('src')
+                if src:
+                    full_src = _urljoin(response.url, src)
+                    images.append({
+                        'src': full_src,
+                        'alt': el.get('alt') or ''
+                    })
+            elif tag == 'meta':
+                # Metadata
+                name = el.get('name')
+                content_attr = el.get('content')
+                if name and content_attr:
+                    meta[name] = content_attr
+            elif tag == 'script':
+                # Structured data (JSON-LD)
+                if el.get('type') == 'application/ld+json':
+                    for script in _own_text(el):
+                        try:
+                            structured_data.append(json.loads(script))
+                        except json.JSONDecodeError:
+                            pass
+            elif tag == 'code':
+                # Code blocks
+                for code in _own_text(el):
+                    text = code.strip()
+                    if text:
+                        code_blocks.append(text)
+            elif tag == 'ul':
+                ul_elements.append(el)
+            elif tag == 'table':
+                table_elements.append(el)
+            elif tag == 'title' and title is None:
+                texts = _own_text(el)
+                if texts:
+                    title = texts[0]
         
-        # Extract main content
-        content = {
-            'url': response.url,
-            'title': title,
-            'content': {},
-            'metadata': {}
-        }
+        # Estimate total pages on first page
+        self._estimate_total_pages(link_urls)
         
-        # Extract headings
-        headings = []
-        for i in range(1, 7):
-            for heading in response.css(f'h{i}::text').getall():
-                headings.append({
-                    'level': i,
-                    'text': heading.strip()
-                })
-        content['content']['headings'] = headings
-        
-        # Extract paragraphs
-        paragraphs = []
-        for p in response.css('p::text').getall():
-            text = p.strip()
-            if text and len(text) > 10:  # Only meaningful paragraphs
-                paragraphs.append(text)
-        content['content']['paragraphs'] = paragraphs
+        # Fall back to the first h1 for the page title
+        if not title:
+            title = first_h1_text
         
-        # Extract lists
+        # Lists and tables need their own (nested) rows, so walk their subtrees
         lists = []
-        for ul in response.css('ul'):
+        for ul in ul_elements:
             list_items = []
-            for li in ul.css('li::text').getall():
-                text = li.strip()
-                if text:
-                    list_items.append(text)
+            for li in ul.iter('li'):
+                for text in _own_text(li):
+                    text = text.strip()
+                    if text:
+                        list_items.append(text)
             if list_items:
                 lists.append(list_items)
-        content['content']['lists'] = lists
         
-        # Extract links
-        links = []
-        for link in response.css('a[href]'):
-            href = link.css('::attr(href)').get()
-            text = link.css('::text').get()
-            if href and text:
-                full_url = urljoin(response.url, href)
-                links.append({
-                    'url': full_url,
-                    'text': text.strip()
-                })
-        content['content']['links'] = links
-        
-        # Extract images
-        images = []
-        for img in response.css('img[src]'):
-            src = img.css('::attr(src)').get()
-            alt = img.css('::attr(alt)').get() or ''
-            if src:
-                full_src = urljoin(response.url, src)
-                images.append({
-                    'src': full_src,
-                    'alt': alt
-                })
-        content['content']['images'] = images
-        
-        # Extract metadata
-        meta = {}
-        for meta_tag in response.css('meta'):
-            name = meta_tag.css('::attr(name)').get()
-            content_attr = meta_tag.css('::attr(content)').get()
-            if name and content_attr:
-                meta[name] = content_attr
-        content['metadata'] = meta
-        
-        # Extract any structured data (JSON-LD)
-        structured_data = []
-        for script in response.css('script[type="application/ld+json"]::text').getall():
-            try:
-                data = json.loads(script)
-                structured_data.append(data)
-            except json.JSONDecodeError:
-                pass
-        content['content']['structured_data'] = structured_data
-        
-        # Extract tables
         tables = []
-        for table in response.css('table'):
+        for table in table_elements:
             table_data = []
-            for row in table.css('tr'):
+            for row in table.iter('tr'):
                 row_data = []
-                for cell in row.css('td, th'):
-                    cell_text = cell.css('::text').get()
+                for cell in row.iter('td', 'th'):
+                    cell_text = next(cell.itertext(), None)
                     if cell_text:
                         row_data.append(cell_text.strip())
                 if row_data:
                     table_data.append(row_data)
             if table_data:
                 tables.append(table_data)
-        content['content']['tables'] = tables
         
-        # Extract code blocks
-        code_blocks = []
-        for code in response.css('code::text').getall():
-            text = code.strip()
-            if text:
-                code_blocks.append(text)
-        content['content']['code_blocks'] = code_blocks
+        # Extract main content
+        content = {
+            'url': response.url,
+            'title': title,
+            'content': {
+                'headings': [heading for level in range(1, 7) for heading in headings_by_level[level]],
+                'paragraphs': paragraphs,
+                'lists': lists,
+                'links': links,
+                'images': images,
+                'structured_data': structured_data,
+                'tables': tables,
+                'code_blocks': code_blocks,
+            },
+            'metadata': meta
+        }
         
-        # Collect data in memory for sorting and deduplication
+        # Collect data for sorting and deduplication
         self._collect_data(content)
         
         # Follow links to other pages on the same domain AND matching the path filter
@@ -302,53 +504,82 @@ class MaxrollSpider(scrapy.Spider):
         links_duplicate = 0
         links_new_found = 0
         
-        for link in response.css('a[href]'):
-            href = link.css('::attr(href)').get()
-            if href:
-                full_url = urljoin(response.url, href)
-                # Only follow links that:
-                # 1. Are on the same domain
-                # 2. Match our path filter (same game/section)
-                # 3. Avoid common non-content URLs
-                # 4. Don't exceed max depth
-                # 5. Haven't been visited before
-                if (full_url.startswith('https://maxroll.gg') and 
-                    not any(skip in full_url for skip in ['#', 'javascript:', 'mailto:', '.pdf', '.jpg', '.png', '.gif', '.webp', '.svg'])):
-                    
-                    normalized_full_url = self._normalize_url(full_url)
-                    
-                    # Always add to found list (for tracking total discovered)
-                    if normalized_full_url not in self.urls_found:
-                        self.urls_found.add(normalized_full_url)
-                        links_new_found += 1
-                    
-                    if self._matches_filter(full_url):
-                        # Check if we've already scraped this URL
-                        if normalized_full_url in self.urls_scraped:
-                            links_duplicate += 1
-                            self.duplicate_urls_skipped += 1
-                        else:
-                            links_followed += 1
-                            # Mark URL as scraped before following
-                            self.urls_scraped.add(normalized_full_url)
-                            # Pass depth information to the next request
-                            yield response.follow(full_url, self.parse, meta={'depth': current_depth + 1})
+        # Depth information passed to the next requests (Request copies meta,
+        # so one dict serves every link on the page)
+        next_meta = {'depth': current_depth + 1}
+        
+        for full_url in link_urls:
+            # Only follow links that:
+            # 1. Are on the same domain
+            # 2. Match our path filter (same game/section)
+            # 3. Avoid common non-content URLs
+            # 4. Don't exceed max depth
+            # 5. Haven't been visited before
+            if self._DOMAIN_RE.match(full_url) and not self._SKIP_RE.search(full_url):
+                
+                # Both filters share the (memoized) hash of the normalized URL
+                fp = _url_fingerprint(full_url)
+                
+                # Always add to found list (for tracking total discovered)
+                if not self.urls_found.add_fingerprint(fp):
+                    links_new_found += 1
+                
+                if self._matches_filter(full_url):
+                    # Check if we've already scraped this URL, marking it
+                    # as scraped before following
+                    if self.urls_scraped.add_fingerprint(fp):
+                        links_duplicate += 1
+                        self.duplicate_urls_skipped += 1
                     else:
-                        links_filtered += 1
-                        self.pages_filtered += 1
+                        links_followed += 1
+                        # full_url is already absolute, so skip response.follow's urljoin
+                        yield scrapy.Request(full_url, callback=self.parse, meta=next_meta)
+                else:
+                    links_filtered += 1
+                    self.pages_filtered += 1
         
-        if links_followed > 0 or links_filtered > 0 or links_duplicate > 0 or links_new_found > 0:
-            self.logger.info(f"Found {links_followed + links_filtered + links_duplicate + links_new_found} links on {response.url}: {links_followed} followed, {links_filtered} filtered out, {links_duplicate} duplicates skipped, {links_new_found} newly discovered")
+        if (links_followed or links_filtered or links_duplicate or links_new_found) and self.logger.isEnabledFor(logging.INFO):
+            self.logger.info("Found %d links on %s: %d followed, %d filtered out, %d duplicates skipped, %d newly discovered",
+                             links_followed + links_filtered + links_duplicate + links_new_found, response.url,
+                             links_followed, links_filtered, links_duplicate, links_new_found)
     
     def _collect_data(self, content):
-        """Collect content in memory for later sorting and deduplication"""
+        """Spool content to disk for later sorting and deduplication"""
         try:
-            # Add to collected data
-            self.collected_data.append(content)
-            self.logger.info(f"Collected data for {content.get('url', 'unknown URL')}")
+            # Add to collected data, keeping the first record seen for a URL
+            url = content.get('url', '')
+            if url in self.collected_data:
+                self.duplicate_records += 1
+            else:
+                line = _encode_json(content).encode('utf-8') + b'\n'
+                self._spool_pending += line
+                self.collected_data[url] = len(self._spool_offsets) - 1
+                self._spool_offsets.append(self._spool_offsets[-1] + len(line))
+                if len(self._spool_pending) >= SPOOL_BUFFER_SIZE:
+                    self._flush_spool()
+            self.logger.debug("Collected data for %s", url or 'unknown URL')
         except Exception as e:
             self.logger.error(f"Error collecting data: {e}")
 
+    def _flush_spool(self):
+        """Hand the pending spool records to the writer thread"""
+        if self._spool_pending:
+            # After a failure the spool is useless, so don't queue more writes
+            if not self._spool_failed:
+                self._writer.submit(self._write_spool_block, bytes(self._spool_pending))
+            self._spool_pending.clear()
+
+    def _write_spool_block(self, block):
+        """Append a block of records to the spool file (runs on the writer thread)"""
+        if self._spool_failed:
+            return
+        try:
+            self._spool_fh.write(block)
+        except Exception as e:
+            # Offsets of every later record would be shifted, so stop here
+            self._spool_failed = True
+            self.logger.error(f"Error writing spool file: {e}")
+
     def _write_sorted_deduplicated_output(self):
         """Write sorted and deduplicated data to file"""
         try:
@@ -356,26 +587,33 @@ class MaxrollSpider(scrapy.Spider):
                 self.logger.info("No data to write")
                 return
             
-            # Remove duplicates based on URL
-            seen_urls = set()
-            unique_data = []
-            for item in self.collected_data:
-                url = item.get('url', '')
-                if url not in seen_urls:
-                    seen_urls.add(url)
-                    unique_data.append(item)
-            
-            # Sort by URL
-            unique_data.sort(key=lambda x: x.get('url', ''))
+            if self._spool_failed:
+                self.logger.error(f"Spool file {self.spool_file} is incomplete, not writing {self.output_file}")
+                return
             
-            # Write sorted, deduplicated data
-            with open(self.output_file, 'w', encoding='utf-8') as f:
-                for item in unique_data:
-                    json_line = json.dumps(item, ensure_ascii=False)
-                    f.write(json_line + '\n')
+            # Records are already unique per URL (collected_data is keyed by
+            # it), so only the sort by URL is left. The spooled lines are
+            # copied over as-is, batched into OUTPUT_CHUNK_SIZE blocks so
+            # there is one write call per block.
+            self._spool_fh.flush()
+            with mmap.mmap(self._spool_fh.fileno(), 0, access=mmap.ACCESS_READ) as spool:
+                offsets = self._spool_offsets
+                if len(spool) != offsets[-1]:
+                    self.logger.error(f"Spool file {self.spool_file} holds {len(spool)} bytes, expected {offsets[-1]}; not writing {self.output_file}")
+                    return
+                with open(self.output_file, 'wb') as f:
+                    buf = bytearray()
+                    for url in sorted(self.collected_data):
+                        i = self.collected_data[url]
+                        buf += spool[offsets[i]:offsets[i + 1]]
+                        if len(buf) >= OUTPUT_CHUNK_SIZE:
+                            f.write(buf)
+                            buf.clear()
+                    if buf:
+                        f.write(buf)
             
-            self.logger.info(f"Wrote {len(unique_data)} sorted, deduplicated records to {self.output_file}")
-            self.logger.info(f"Removed {len(self.collected_data) - len(unique_data)} duplicate records")
+            self.logger.info(f"Wrote {len(self.collected_data)} sorted, deduplicated records to {self.output_file}")
+            self.logger.info(f"Removed {self.duplicate_records} duplicate records")
             
         except Exception as e:
             self.logger.error(f"Error writing sorted output: {e}")
@@ -383,23 +621,59 @@ class MaxrollSpider(scrapy.Spider):
     def _write_compact_output(self, content):
         """Write content to file in compact format (one line per record)"""
         try:
-            json_line = json.dumps(content, ensure_ascii=False)
-            with open(self.output_file, 'a', encoding='utf-8') as f:
-                f.write(json_line + '\n')
-            self.logger.info(f"Wrote compact line to {self.output_file}: {len(json_line)} characters")
+            json_line = _encode_json(content)
+            self._writer.submit(self._write_compact_line, json_line)
+        except Exception as e:
+            self.logger.error(f"Error writing compact output: {e}")
+
+    def _write_compact_line(self, json_line):
+        """Append one compact line to the output file (runs on the writer thread)"""
+        try:
+            # Keep one buffered handle open for the whole crawl instead of
+            # reopening the file for every record
+            if self._compact_fh is None:
+                self._compact_fh = open(self.output_file, 'a', encoding='utf-8', buffering=OUTPUT_CHUNK_SIZE)
+            self._compact_fh.write(json_line)
+            self._compact_fh.write('\n')
+            self.logger.debug("Wrote compact line to %s: %d characters", self.output_file, len(json_line))
         except Exception as e:
             self.logger.error(f"Error writing compact output: {e}")
 
+    def _remove_spool_file(self):
+        """Close and delete the spool file"""
+        if self._spool_fh is None:
+            return  # Never opened, so there's nothing of ours to delete
+        try:
+            self._spool_fh.close()
+            self._spool_fh = None
+            os.remove(self.spool_file)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            self.logger.error(f"Error removing spool file: {e}")
+
     def closed(self, reason):
         """Called when spider is closed"""
+        # Let the writer thread finish everything queued during the crawl
+        self._flush_spool()
+        self._writer.shutdown(wait=True)
+        
+        if self._compact_fh is not None:
+            self._compact_fh.close()
+            self._compact_fh = None
+        
         # Write sorted and deduplicated output
         self._write_sorted_deduplicated_output()
+        self._remove_spool_file()
         
         self.logger.info(f"Spider finished. Summary:")
         self.logger.info(f"  - Pages processed: {self.pages_processed}")
         self.logger.info(f"  - Pages filtered out: {self.pages_filtered}")
         self.logger.info(f"  - Pages exceeding max depth: {self.depth_exceeded}")
+        self.logger.info(f"  - Non-HTML or oversized pages skipped: {self.pages_skipped}")
         self.logger.info(f"  - Duplicate URLs skipped: {self.duplicate_urls_skipped}")
+        if self.dedupe_paragraphs:
+            self.logger.info(f"  - Duplicate paragraphs skipped: {self.duplicate_paragraphs_skipped}")
         self.logger.info(f"  - Total URLs discovered: {len(self.urls_found)}")
         self.logger.info(f"  - Total URLs scraped: {len(self.urls_scraped)}")
         self.logger.info(f"  - Filter depth: {self.filter_depth}")